@@ -4,8 +4,9 @@ Support for Sense HAT sensors.
 For more details about this component, please refer to the documentation at
 https://home-assistant.io/components/sensor.sensehat
 """
-import os
 import logging
+import subprocess
+from collections import deque
 from datetime import timedelta
 
 import voluptuous as vol
@@ -25,42 +26,94 @@ CONF_IS_HAT_ATTACHED = 'is_hat_attached'
 
 MIN_TIME_BETWEEN_UPDATES = timedelta(seconds=60)
 
+AVERAGE_WINDOW = 3
+
+CPU_THERMAL_ZONE = '/sys/class/thermal/thermal_zone0/temp'
+
 SENSOR_TYPES = {
-    'temperature': ['temperature', TEMP_CELSIUS],
-    'humidity': ['humidity', '%'],
-    'pressure': ['pressure', 'mb'],
+    'temperature': ('temperature', TEMP_CELSIUS),
+    'humidity': ('humidity', '%'),
+    'pressure': ('pressure', 'mb'),
 }
 
 PLATFORM_SCHEMA = PLATFORM_SCHEMA.extend({
-    vol.Required(CONF_DISPLAY_OPTIONS, default=SENSOR_TYPES):
-        [vol.In(SENSOR_TYPES)],
+    vol.Required(CONF_DISPLAY_OPTIONS, default=list(SENSOR_TYPES)):
+        vol.All(cv.ensure_list, vol.Length(min=1), [vol.In(SENSOR_TYPES)]),
     vol.Optional(CONF_NAME, default=DEFAULT_NAME): cv.string,
     vol.Optional(CONF_IS_HAT_ATTACHED, default=True): cv.boolean
 })
 
 
 def get_cpu_temp():
-    """Get CPU temperature."""
-    res = os.popen("vcgencmd measure_temp").readline()
-    t_cpu = float(res.replace("temp=", "").replace("'C\n", ""))
-    return t_cpu
+    """Get CPU temperature from sysfs, falling back to vcgencmd."""
+    try:
+        with open(CPU_THERMAL_ZONE) as thermal_zone:
+            return int(thermal_zone.read()) / 1000
+    except (OSError, ValueError):
+        _LOGGER.debug("Unable to read %s, using vcgencmd", CPU_THERMAL_ZONE)
+
+    res = subprocess.check_output(
+        ['vcgencmd', 'measure_temp']).decode('utf-8')
+    return float(res.partition('=')[2].partition("'")[0])
 
 
 def get_average(temp_base):
     """Use moving average to get better readings."""
     if not hasattr(get_average, "temp"):
-        get_average.temp = [temp_base, temp_base, temp_base]
-    get_average.temp[2] = get_average.temp[1]
-    get_average.temp[1] = get_average.temp[0]
-    get_average.temp[0] = temp_base
-    temp_avg = (get_average.temp[0] + get_average.temp[1]
-                + get_average.temp[2]) / 3
-    return temp_avg
+        get_average.temp = deque([temp_base] * AVERAGE_WINDOW,
+                                 maxlen=AVERAGE_WINDOW)
+        get_average.total = temp_base * AVERAGE_WINDOW
+    get_average.total += temp_base - get_average.temp[0]
+    get_average.temp.append(temp_base)
+    return get_average.total / AVERAGE_WINDOW
+
+
+def read_humidity(sensehat):
+    """Read humidity and temperature from a single HTS221 sample.
+
+    The public getters poll the chip once for the value and again for the
+    temperature, so use the underlying RTIMULib reader when available.
+    Invalid readings are returned as None only on that path; the public
+    getters report them as 0, which cannot be told apart from a real 0.
+    """
+    if not (hasattr(sensehat, '_humidity') and
+            hasattr(sensehat, '_init_humidity')):
+        return (sensehat.get_humidity(),
+                sensehat.get_temperature_from_humidity())
+
+    # pylint: disable=protected-access
+    sensehat._init_humidity()
+    humidity_valid, humidity, temp_valid, temp = (
+        sensehat._humidity.humidityRead())
+    return (humidity if humidity_valid else None,
+            temp if temp_valid else None)
+
+
+def read_pressure(sensehat):
+    """Read pressure and temperature from a single LPS25H sample.
+
+    As with read_humidity, invalid readings are only None when the
+    RTIMULib reader is available.
+    """
+    if not (hasattr(sensehat, '_pressure') and
+            hasattr(sensehat, '_init_pressure')):
+        return (sensehat.get_pressure(),
+                sensehat.get_temperature_from_pressure())
+
+    # pylint: disable=protected-access
+    sensehat._init_pressure()
+    pressure_valid, pressure, temp_valid, temp = (
+        sensehat._pressure.pressureRead())
+    return (pressure if pressure_valid else None,
+            temp if temp_valid else None)
 
 
 def setup_platform(hass, config, add_devices, discovery_info=None):
     """Set up the Sense HAT sensor platform."""
-    data = SenseHatData(config.get(CONF_IS_HAT_ATTACHED))
+    from sense_hat import SenseHat
+    sensehat = SenseHat()
+
+    data = SenseHatData(sensehat, config.get(CONF_IS_HAT_ATTACHED))
     dev = []
     for variable in config[CONF_DISPLAY_OPTIONS]:
         dev.append(SenseHatSensor(data, variable))
@@ -74,8 +127,7 @@ class SenseHatSensor(Entity):
     def __init__(self, data, sensor_types):
         """Initialize the sensor."""
         self.data = data
-        self._name = SENSOR_TYPES[sensor_types][0]
-        self._unit_of_measurement = SENSOR_TYPES[sensor_types][1]
+        self._name, self._unit_of_measurement = SENSOR_TYPES[sensor_types]
         self.type = sensor_types
         self._state = None
 
@@ -101,19 +153,15 @@ class SenseHatSensor(Entity):
             _LOGGER.error("Don't receive data")
             return
 
-        if self.type == 'temperature':
-            self._state = self.data.temperature
-        if self.type == 'humidity':
-            self._state = self.data.humidity
-        if self.type == 'pressure':
-            self._state = self.data.pressure
+        self._state = getattr(self.data, self.type)
 
 
 class SenseHatData(object):
     """Get the latest data and update."""
 
-    def __init__(self, is_hat_attached):
+    def __init__(self, sensehat, is_hat_attached):
         """Initialize the data object."""
+        self.sensehat = sensehat
         self.temperature = None
         self.humidity = None
         self.pressure = None
@@ -122,10 +170,15 @@ class SenseHatData(object):
     @Throttle(MIN_TIME_BETWEEN_UPDATES)
     def update(self):
         """Get the latest data from Sense HAT."""
-        from sense_hat import SenseHat
-        sense = SenseHat()
-        temp_from_h = sense.get_temperature_from_humidity()
-        temp_from_p = sense.get_temperature_from_pressure()
+        humidity, temp_from_h = read_humidity(self.sensehat)
+        pressure, temp_from_p = read_pressure(self.sensehat)
+        self.humidity = humidity
+        self.pressure = pressure
+
+        if temp_from_h is None or temp_from_p is None:
+            _LOGGER.warning("Invalid temperature reading from Sense HAT")
+            return
+
         t_total = (temp_from_h + temp_from_p) / 2
 
         if self.is_hat_attached:
@@ -136,5 +189,3 @@ class SenseHatData(object):
             t_correct = get_average(t_total)
 
         self.temperature = t_correct
-        self.humidity = sense.get_humidity()
-        self.pressure = sense.get_pressure()